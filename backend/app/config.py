@@ -0,0 +1,12 @@
+"""
+config.py - Shared runtime settings for PDF Q&A app
+
+This module reads the settings used by more than one module, such as the number of threads each server process may use.
+"""
+
+import os
+
+# Threads for embedding: EMBED_THREADS, or the cores split evenly across uvicorn workers (WEB_CONCURRENCY).
+EMBED_THREADS = int(os.getenv("EMBED_THREADS") or max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY") or 1)))
+if EMBED_THREADS < 1:
+    raise ValueError("EMBED_THREADS must be a positive integer.")
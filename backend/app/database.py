@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker
 from .models import Base
 import os
@@ -13,11 +13,53 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable must be set for PostgreSQL connection.")
 
-engine = create_engine(DATABASE_URL)
+# Reuse up to DB_POOL_SIZE connections and check them before use instead of failing on stale ones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite (local development): allow use across threads and tune each connection for mixed reads/writes
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, pool_pre_ping=True)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+else:
+    engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=DB_POOL_SIZE, max_overflow=0)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Columns added to existing tables after their first release, with the DDL used to add them.
+# create_all only creates missing tables, so older databases get these through ALTER TABLE on startup.
+ADDED_COLUMNS = {
+    "documents": {
+        "status": "VARCHAR DEFAULT 'ready'",
+        "sha256": "VARCHAR(64)",
+        "lease_expires": "TIMESTAMP",
+    },
+}
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """
+    Add any column from ADDED_COLUMNS that an existing table is missing, and any index declared on the models
+    that does not exist yet (create_all skips both for tables that already exist). Safe to run on every startup.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table_name, columns in ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for column_name, ddl in columns.items():
+                if column_name not in existing:
+                    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
 
 def get_db():
     db = SessionLocal()
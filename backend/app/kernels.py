@@ -0,0 +1,112 @@
+"""
+kernels.py - Numba-compiled numeric kernels for PDF Q&A app
+
+This module provides JIT-compiled helpers for the hot loops of the NLP pipeline, such as brute-force top-k
+retrieval over the embeddings of small documents and fixed-size text chunking. Kernels are cached on disk and warmed up on import, so only
+the first process start pays the LLVM compilation cost.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+def quantize_int8(X: np.ndarray):
+    """
+    Quantize a matrix (or a single vector) of embeddings to int8 with one scale factor per vector.
+    Returns (values, scales) such that X ~= values * scales[..., None].
+    """
+    X = np.asarray(X, dtype=np.float32)
+    scales = np.abs(X).max(axis=-1) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    values = np.round(X / scales[..., None]).astype(np.int8)
+    return values, scales
+
+@njit(cache=True)
+def _select_topk(scores, k):
+    """
+    Select the k highest scores, keeping the best in a small sorted buffer (insertion sort, k is tiny).
+    Returns (indices, scores) arrays, best match first.
+    """
+    k = min(k, scores.shape[0])
+    best_idx = np.full(k, -1, dtype=np.int64)
+    best_scores = np.full(k, -np.inf, dtype=np.float32)
+    for i in range(scores.shape[0]):
+        s = scores[i]
+        if k > 0 and s > best_scores[k - 1]:
+            j = k - 1
+            while j > 0 and best_scores[j - 1] < s:
+                best_scores[j] = best_scores[j - 1]
+                best_idx[j] = best_idx[j - 1]
+                j -= 1
+            best_scores[j] = s
+            best_idx[j] = i
+    return best_idx, best_scores
+
+@njit(parallel=True, fastmath=True, cache=True)
+def topk_int8(Xq, scales, qq, q_scale, k):
+    """
+    Find the k rows of Xq with the highest dot product with the query qq, both packed by quantize_int8.
+    Embeddings are normalized, so the rescaled scores are (approximately) cosine similarities.
+    Dot products are accumulated in int32 and rescaled to float only for the top-k selection.
+    Returns (indices, scores) arrays, best match first.
+    """
+    n, d = Xq.shape
+    scores = np.empty(n, dtype=np.float32)
+    for i in prange(n):
+        acc = np.int32(0)
+        for j in range(d):
+            acc += np.int32(Xq[i, j]) * np.int32(qq[j])
+        scores[i] = np.float32(acc) * scales[i] * q_scale
+    return _select_topk(scores, k)
+
+@njit(cache=True)
+def _find_break(data, start, end, first, second):
+    """
+    Find the last position p in (start + 1, end] just after the byte pair (first, second), or -1.
+    A negative first byte matches any byte, so only second has to match.
+    """
+    for p in range(end, start + 1, -1):
+        if data[p - 1] == second and (first < 0 or data[p - 2] == first):
+            return p
+    return -1
+
+@njit(cache=True)
+def split_fixed(data, size, overlap):
+    """
+    Split UTF-8 encoded text into chunks of at most size bytes, overlapping by up to overlap bytes.
+    Each chunk ends at the last paragraph break, sentence end or line break before the size limit, and
+    the next one starts at a word boundary about overlap bytes earlier, so cuts never land inside a character.
+    Returns (starts, ends, ok) byte offsets; ok is False if some window had no break past half the chunk size.
+    """
+    n = data.shape[0]
+    # Every chunk but the last is at least min_len bytes, so each step advances by at least min_len - overlap
+    min_len = max(size // 2, overlap + 1)
+    starts = np.empty(n // (min_len - overlap) + 1, dtype=np.int64)
+    ends = np.empty_like(starts)
+    count = 0
+    start = 0
+    while start < n:
+        end = start + size
+        if end >= n:
+            starts[count] = start
+            ends[count] = n
+            count += 1
+            break
+        cut = _find_break(data, start, end, 10, 10)  # paragraph break
+        if cut < start + min_len:
+            cut = _find_break(data, start, end, 46, 32)  # sentence end
+        if cut < start + min_len:
+            cut = _find_break(data, start, end, -1, 10)  # line break
+        if cut < start + min_len:
+            return starts[:0], ends[:0], False
+        starts[count] = start
+        ends[count] = cut
+        count += 1
+        # Step back by the overlap, then forward to the start of the next word
+        start = cut - overlap
+        while start < cut and data[start - 1] != 32 and data[start - 1] != 10:
+            start += 1
+    return starts[:count], ends[:count], True
+
+# Compile (or load from the on-disk cache) at import time rather than on the first request
+split_fixed(np.zeros(1, dtype=np.uint8), 1000, 200)
+topk_int8(np.zeros((1, 384), dtype=np.int8), np.ones(1, dtype=np.float32), np.zeros(384, dtype=np.int8), np.float32(1.0), 1)
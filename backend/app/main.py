@@ -4,24 +4,35 @@ main.py - FastAPI backend for PDF Q&A app
 This file defines the main API endpoints and application logic for uploading PDFs, processing them, asking questions, and managing chat/document data.
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Form, Path
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Form, Path, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, insert, or_, select
 from sqlalchemy.orm import Session
 import os
+import time
 import uuid
-import shutil
-from datetime import datetime
+import asyncio
+import hashlib
+import logging
+import aiofiles
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
 
 # Import database session and models
-from .database import get_db, create_tables
+from .database import get_db, create_tables, SessionLocal
 from .models import Document, Question
 # Import PDF and NLP processing utilities
 from .pdf_processor import PDFProcessor
-from .nlp_processor import NLPProcessor
+from .nlp_processor import NLPProcessor, clear_answer_cache, delete_document_vectors
+
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app instance
-app = FastAPI(title="PDF Question-Answering API", version="1.0.0")
+# Serialize all responses with orjson, which is faster than the stdlib json module. Routes return plain dicts without a
+# response_model, so FastAPI still runs jsonable_encoder first (datetimes become ISO strings before orjson sees them).
+app = FastAPI(title="PDF Question-Answering API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Enable CORS for frontend communication
 app.add_middleware(
@@ -34,81 +45,322 @@ app.add_middleware(
 
 # Initialize PDF and NLP processors
 pdf_processor = PDFProcessor()
-nlp_processors = {}  # Cache NLPProcessor instances per document
+MAX_CACHED_PROCESSORS = 32
+nlp_processors = OrderedDict()  # LRU cache of NLPProcessor instances per document
+
+def cache_processor(document_id: int, nlp_processor: NLPProcessor):
+    """
+    Store an NLPProcessor in the LRU cache, evicting the least recently used one when full.
+    """
+    nlp_processors[document_id] = nlp_processor
+    nlp_processors.move_to_end(document_id)
+    while len(nlp_processors) > MAX_CACHED_PROCESSORS:
+        nlp_processors.popitem(last=False)
+
+# Statements for the /ask hot path, built once at import instead of going through the ORM per request
+SELECT_DOC = select(
+    Document.id,
+    Document.original_filename,
+    Document.status
+).where(Document.id == bindparam("id"))
+# Finds an earlier, fully indexed upload of the same file (by content hash) so it is not processed twice.
+# Documents still processing or failed are not reused, so uploading the file again always starts a fresh run.
+SELECT_DOC_BY_HASH = select(
+    Document.id,
+    Document.original_filename,
+    Document.page_count,
+    Document.file_size
+).where(Document.sha256 == bindparam("sha256"), Document.status == "ready").limit(1)
+# Only needed to rebuild a missing index, so kept off the hot path
+SELECT_DOC_SOURCE = select(
+    Document.file_path,
+    Document.text_content
+).where(Document.id == bindparam("id"))
+INSERT_QUESTION = insert(Question.__table__)
+
+# Uploads are streamed to disk in 1 MiB reads; MAX_FILE_SIZE (bytes, optional) caps the accepted size
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE") or 0)
+
+# Uploaded documents waiting for text extraction and embedding, as (document_id, file_path) pairs
+processing_queue = asyncio.Queue()
+# A server process owns a document it is processing until the document's lease expires; the lease is renewed while
+# pages are extracted, so documents abandoned by a crashed or restarted process are taken over by another one
+PROCESSING_LEASE_SECONDS = int(os.getenv("PROCESSING_LEASE_SECONDS", "300"))
 
 # Ensure database tables exist
 create_tables()
 
+def set_document_status(document_id: int, status: str) -> int:
+    """
+    Record the processing status of a document in its own session, for use outside request handlers.
+    Returns the number of rows updated: 0 if the document was deleted in the meantime.
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(Document).filter(Document.id == document_id).update({"status": status})
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+def lease_deadline() -> datetime:
+    """
+    Return the expiry time of a processing lease taken or renewed now.
+    """
+    return datetime.now() + timedelta(seconds=PROCESSING_LEASE_SECONDS)
+
+def renew_lease(document_id: int):
+    """
+    Extend the processing lease of a document held by this process.
+    """
+    db = SessionLocal()
+    try:
+        db.query(Document).filter(Document.id == document_id).update({"lease_expires": lease_deadline()})
+        db.commit()
+    finally:
+        db.close()
+
+def leased_pages(pages: Iterator[Tuple[int, str]], document_id: int) -> Iterator[Tuple[int, str]]:
+    """
+    Pass the pages of a document through, renewing its processing lease every third of the lease period.
+    """
+    renew_at = time.monotonic() + PROCESSING_LEASE_SECONDS / 3
+    for page in pages:
+        if time.monotonic() >= renew_at:
+            renew_lease(document_id)
+            renew_at = time.monotonic() + PROCESSING_LEASE_SECONDS / 3
+        yield page
+
+def claim_stale_documents() -> List[Tuple[int, str]]:
+    """
+    Take over documents left in processing whose lease has expired (or that predate leases).
+    Each claim is a conditional UPDATE, so when several server processes sweep at once only one of them wins a document.
+    Returns the claimed (document_id, file_path) pairs.
+    """
+    now = datetime.now()
+    stale = (Document.status == "processing", or_(Document.lease_expires.is_(None), Document.lease_expires < now))
+    db = SessionLocal()
+    try:
+        candidates = db.query(Document.id, Document.file_path).filter(*stale).order_by(Document.id).all()
+        claimed = []
+        for document_id, file_path in candidates:
+            updated = (
+                db.query(Document)
+                .filter(Document.id == document_id, *stale)
+                .update({"lease_expires": lease_deadline()}, synchronize_session=False)
+            )
+            db.commit()
+            if updated:
+                claimed.append((document_id, file_path))
+        return claimed
+    finally:
+        db.close()
+
+def fail_document(document_id: int):
+    """
+    Mark a document as failed and drop any chunks indexed before the failure, so a partial index is never searched.
+    """
+    delete_document_vectors(str(document_id))
+    set_document_status(document_id, "failed")
+
+def process_uploaded_document(document_id: int, file_path: str):
+    """
+    Extract, split and embed an uploaded PDF page by page, then record the outcome in the document's status.
+    Runs in a worker thread so the CPU-bound work does not block the event loop.
+    Returns the ready NLPProcessor, or None if processing failed.
+    """
+    nlp_processor = NLPProcessor()
+    success = nlp_processor.process_document_streaming(
+        leased_pages(pdf_processor.iter_pages(file_path), document_id),
+        str(document_id)
+    )
+    if not success:
+        fail_document(document_id)
+        return None
+    if not set_document_status(document_id, "ready"):
+        # Deleted while processing: drop the chunks indexed since, so they cannot leak into a reused id
+        delete_document_vectors(str(document_id))
+        return None
+    return nlp_processor
+
+def load_document_processor(document_id: int) -> NLPProcessor:
+    """
+    Create an NLPProcessor bound to a document's indexed chunks, rebuilding the index if it is missing.
+    Runs in a worker thread, since a rebuild extracts and embeds the whole document again.
+    """
+    nlp_processor = NLPProcessor()
+    if not nlp_processor.load_existing_vectorstore(str(document_id)):
+        # Rebuild the index from the stored text (older uploads) or by re-reading the PDF
+        db = SessionLocal()
+        try:
+            source = db.execute(SELECT_DOC_SOURCE, {"id": document_id}).first()
+        finally:
+            db.close()
+        if source.text_content:
+            success = nlp_processor.process_document(source.text_content, str(document_id))
+        else:
+            success = nlp_processor.process_document_streaming(
+                pdf_processor.iter_pages(source.file_path),
+                str(document_id)
+            )
+        if not success:
+            # Drop the chunks indexed before the failure, so the next request rebuilds instead of searching a partial index
+            delete_document_vectors(str(document_id))
+            raise RuntimeError("Failed to rebuild the document index")
+    return nlp_processor
+
+async def processing_worker():
+    """
+    Background task consuming the processing queue, one document at a time.
+    Whenever the queue stays empty for a lease period, it takes over documents abandoned by other processes.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            document_id, file_path = await asyncio.wait_for(processing_queue.get(), timeout=PROCESSING_LEASE_SECONDS)
+        except asyncio.TimeoutError:
+            try:
+                for item in await loop.run_in_executor(None, claim_stale_documents):
+                    processing_queue.put_nowait(item)
+            except Exception as e:
+                logger.error(f"Error claiming abandoned documents: {str(e)}")
+            continue
+        try:
+            nlp_processor = await loop.run_in_executor(None, process_uploaded_document, document_id, file_path)
+            if nlp_processor:
+                cache_processor(document_id, nlp_processor)
+        except Exception as e:
+            logger.error(f"Error processing document {document_id}: {str(e)}")
+            try:
+                await loop.run_in_executor(None, fail_document, document_id)
+            except Exception as cleanup_error:
+                logger.error(f"Error marking document {document_id} as failed: {str(cleanup_error)}")
+        finally:
+            processing_queue.task_done()
+
+async def save_upload(file: UploadFile, file_path: str) -> str:
+    """
+    Stream an uploaded file to disk without blocking the event loop, hashing it as it is written.
+    Raises a 413 HTTPException as soon as the upload exceeds MAX_FILE_SIZE.
+    Returns the SHA-256 hex digest of the file.
+    """
+    size = 0
+    digest = hashlib.sha256()
+    async with aiofiles.open(file_path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if MAX_FILE_SIZE and size > MAX_FILE_SIZE:
+                raise HTTPException(status_code=413, detail=f"File exceeds the maximum size of {MAX_FILE_SIZE} bytes")
+            digest.update(chunk)
+            await buffer.write(chunk)
+    return digest.hexdigest()
+
 @app.on_event("startup")
 async def startup_event():
     """
     Application startup event.
-    Ensures the uploads directory exists and prints a startup message.
+    Ensures the uploads directory exists, re-queues documents abandoned in processing by a previous run,
+    starts the background processing worker and prints a startup message.
     """
     os.makedirs("uploads", exist_ok=True)
+    for item in claim_stale_documents():
+        processing_queue.put_nowait(item)
+    app.state.processing_worker = asyncio.create_task(processing_worker())
     print("PDF Q&A Application started successfully!")
 
-@app.post("/upload")
+@app.post("/upload", status_code=202)
 async def upload_pdf(
+    response: Response,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
     """
-    Upload a PDF file, extract its text, and store document info in the database.
-    Returns metadata about the uploaded document.
+    Upload a PDF file, store document info in the database, and queue it for text extraction and embedding.
+    Returns metadata about the uploaded document immediately; poll /documents/{document_id}/status until it is ready.
     """
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
+    # Generate a unique filename for the uploaded file
+    file_id = str(uuid.uuid4())
+    filename = f"{file_id}.pdf"
+    file_path = os.path.join("uploads", filename)
+
     try:
-        # Generate a unique filename and save the uploaded file
-        file_id = str(uuid.uuid4())
-        filename = f"{file_id}.pdf"
-        file_path = os.path.join("uploads", filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Extract text and metadata from the PDF
-        pdf_result = pdf_processor.extract_text_from_pdf(file_path)
-        if not pdf_result["success"]:
-            raise HTTPException(status_code=500, detail=f"PDF processing failed: {pdf_result['error']}")
+        # Stream the uploaded file to disk
+        sha256 = await save_upload(file, file_path)
+
+        # Identical file uploaded before: reuse that document and its index instead of processing it again
+        existing = db.execute(SELECT_DOC_BY_HASH, {"sha256": sha256}).first()
+        if existing:
+            os.remove(file_path)
+            response.status_code = 200
+            return {
+                "message": "PDF already uploaded",
+                "document_id": existing.id,
+                "filename": existing.original_filename,
+                "page_count": existing.page_count,
+                "file_size": existing.file_size,
+                "status": "ready",
+                "nlp_ready": True,
+                "duplicate": True
+            }
+
+        # Read file metadata; page text is extracted by the background worker
         file_info = pdf_processor.get_file_info(file_path)
         if not file_info["success"]:
-            raise HTTPException(status_code=500, detail=f"File info extraction failed: {file_info['error']}")
+            raise HTTPException(status_code=500, detail=f"PDF processing failed: {file_info['error']}")
 
-        # Store document metadata in the database
+        # Store document metadata in the database (the text lives in the vector store, not in the row)
         db_document = Document(
             filename=filename,
             original_filename=file.filename,
             file_path=file_path,
-            text_content=pdf_result["full_text"],
-            page_count=pdf_result["page_count"],
-            file_size=file_info["file_size"]
+            page_count=file_info["page_count"],
+            file_size=file_info["file_size"],
+            sha256=sha256,
+            status="processing",
+            lease_expires=lease_deadline()
         )
         db.add(db_document)
         db.commit()
         db.refresh(db_document)
 
-        # Process the document for NLP (vector store, embeddings)
-        nlp_processor = NLPProcessor()
-        success = nlp_processor.process_document(pdf_result["full_text"], str(db_document.id))
-        if success:
-            nlp_processors[db_document.id] = nlp_processor
+        # Hand the document over to the background worker
+        await processing_queue.put((db_document.id, file_path))
 
-        return JSONResponse(content={
-            "message": "PDF uploaded and processed successfully",
+        return {
+            "message": "PDF uploaded, processing started",
             "document_id": db_document.id,
             "filename": file.filename,
-            "page_count": pdf_result["page_count"],
+            "page_count": file_info["page_count"],
             "file_size": file_info["file_size"],
-            "nlp_ready": success
-        })
+            "status": db_document.status,
+            "nlp_ready": False
+        }
     except Exception as e:
-        # Clean up file if an error occurs during upload or processing
+        # Clean up file if an error occurs during upload
         if os.path.exists(file_path):
             os.remove(file_path)
+        if isinstance(e, HTTPException) and e.status_code == 413:
+            raise
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@app.get("/documents/{document_id}/status")
+async def get_document_status(document_id: int, db: Session = Depends(get_db)):
+    """
+    Retrieve the processing status of a document: "processing", "ready" or "failed".
+    """
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {
+        "document_id": document.id,
+        "status": document.status,
+        "nlp_ready": document.status == "ready"
+    }
+
 @app.post("/ask")
 async def ask_question(
     document_id: int = Form(...),
@@ -120,57 +372,64 @@ async def ask_question(
     Uses the NLP processor to generate an answer and stores the Q&A in the database.
     """
     # Ensure the document exists
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = db.execute(SELECT_DOC, {"id": document_id}).first()
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
+    if document.status == "processing":
+        raise HTTPException(status_code=409, detail="Document is still being processed")
+    if document.status == "failed":
+        raise HTTPException(status_code=409, detail="Document processing failed; please upload it again")
 
     try:
         # Load or initialize the NLP processor for this document
-        if document_id not in nlp_processors:
-            nlp_processor = NLPProcessor()
-            if nlp_processor.load_existing_vectorstore(str(document_id)):
-                nlp_processors[document_id] = nlp_processor
-            else:
-                nlp_processor.process_document(document.text_content, str(document_id))
-                nlp_processors[document_id] = nlp_processor
-        nlp_processor = nlp_processors[document_id]
-
-        # Get the answer from the NLP chain
-        result = nlp_processor.answer_question(question)
+        loop = asyncio.get_running_loop()
+        nlp_processor = nlp_processors.get(document_id)
+        if nlp_processor:
+            nlp_processors.move_to_end(document_id)
+        else:
+            nlp_processor = await loop.run_in_executor(None, load_document_processor, document_id)
+            cache_processor(document_id, nlp_processor)
+
+        # Get the answer in a worker thread: embedding the question and the LLM call block for up to seconds
+        result = await loop.run_in_executor(None, nlp_processor.answer_question, question)
         if not result["success"]:
             raise HTTPException(status_code=500, detail=f"Question processing failed: {result['error']}")
 
         # Store the question and answer in the database
-        db_question = Question(
-            document_id=document_id,
-            question_text=question,
-            answer_text=result["answer"]
-        )
-        db.add(db_question)
+        db.execute(INSERT_QUESTION, {
+            "document_id": document_id,
+            "question_text": question,
+            "answer_text": result["answer"]
+        })
         db.commit()
 
-        return JSONResponse(content={
+        return {
             "answer": result["answer"],
             "question": question,
             "document_filename": document.original_filename,
             "sources": result.get("source_documents", [])
-        })
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Question processing failed: {str(e)}")
 
 @app.get("/documents")
-async def get_documents(db: Session = Depends(get_db)):
+async def get_documents(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
     """
-    Retrieve a list of all uploaded documents with their metadata.
+    Retrieve a page of uploaded documents with their metadata, newest first.
     """
-    documents = db.query(Document).all()
+    documents = db.query(Document).order_by(Document.id.desc()).offset(offset).limit(limit).all()
     return [
         {
             "id": doc.id,
             "filename": doc.original_filename,
             "upload_date": doc.upload_date,
             "page_count": doc.page_count,
-            "file_size": doc.file_size
+            "file_size": doc.file_size,
+            "status": doc.status
         }
         for doc in documents
     ]
@@ -178,9 +437,14 @@ async def get_documents(db: Session = Depends(get_db)):
 @app.get("/questions/{document_id}")
 async def get_questions(document_id: int, db: Session = Depends(get_db)):
     """
-    Retrieve all questions and answers (chat history) for a specific document.
+    Retrieve all questions and answers (chat history) for a specific document, in the order they were asked.
     """
-    questions = db.query(Question).filter(Question.document_id == document_id).all()
+    questions = (
+        db.query(Question)
+        .filter(Question.document_id == document_id)
+        .order_by(Question.timestamp, Question.id)
+        .all()
+    )
     return [
         {
             "id": q.id,
@@ -194,22 +458,26 @@ async def get_questions(document_id: int, db: Session = Depends(get_db)):
 @app.delete("/documents/{document_id}")
 async def delete_document(document_id: int = Path(...), db: Session = Depends(get_db)):
     """
-    Delete a document and all its associated chat history from the database.
+    Delete a document and all its associated chat history from the database, along with its indexed chunks.
     """
     db.query(Question).filter(Question.document_id == document_id).delete()
     db.query(Document).filter(Document.id == document_id).delete()
     db.commit()
+    nlp_processors.pop(document_id, None)
+    delete_document_vectors(str(document_id))
     return {"message": "Document and its chats deleted"}
 
 @app.delete("/questions/{document_id}")
 async def delete_chats(document_id: int = Path(...), db: Session = Depends(get_db)):
     """
-    Delete all chat history (questions/answers) for a specific document.
+    Delete all chat history (questions/answers) for a specific document, along with its cached answers.
     """
     db.query(Question).filter(Question.document_id == document_id).delete()
     db.commit()
+    clear_answer_cache(str(document_id))
     return {"message": "All chats for document deleted"}
 
 if __name__ == "__main__":
+    # Prefer `uvicorn app.main:app`: PDF extraction workers are spawned and re-import this module when run as __main__
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from datetime import datetime
 
@@ -13,15 +14,20 @@ class Document(Base):
     original_filename = Column(String)
     file_path = Column(String)
     upload_date = Column(DateTime, default=func.now())
-    text_content = Column(Text)
+    text_content = deferred(Column(Text))  # only set for older uploads; loaded on access
     page_count = Column(Integer)
     file_size = Column(Integer)
+    sha256 = Column(String(64), index=True)  # content hash, used to detect duplicate uploads
+    status = Column(String, default="ready")  # "processing", "ready" or "failed"
+    lease_expires = Column(DateTime)  # while processing: when another server process may take the document over
 
 class Question(Base):
     __tablename__ = "questions"
+    # Chat history is read per document in timestamp order; this index also serves lookups by document_id alone
+    __table_args__ = (Index("ix_questions_doc_ts", "document_id", "timestamp"),)
     
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, index=True)
+    document_id = Column(Integer)
     question_text = Column(Text)
     answer_text = Column(Text)
     timestamp = Column(DateTime, default=func.now())
\ No newline at end of file
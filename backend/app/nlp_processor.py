@@ -1,99 +1,249 @@
 """
 nlp_processor.py - NLP utilities for PDF Q&A app
 
-This module provides the NLPProcessor class, which handles text chunking, embedding, vector storage, and question answering using LangChain and OpenAI.
+This module provides the NLPProcessor class, which handles text chunking, embedding, vector storage, and question answering using OpenAI.
 """
 
 import os
+import hashlib
 import logging
+from typing import Iterable, List, Tuple
+from .config import EMBED_THREADS
+
+# OpenMP/MKL (and Numba, for the parallel retrieval kernel) read their thread counts when torch, numpy and numba
+# are first imported, so this runs before those imports.
+os.environ.setdefault("OMP_NUM_THREADS", str(EMBED_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(EMBED_THREADS))
+os.environ.setdefault("NUMBA_NUM_THREADS", str(EMBED_THREADS))
+
+import numpy as np
+import redis
+import torch
+from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.llms import OpenAI
-from langchain.chains import RetrievalQA
-from langchain.docstore.document import Document
+from openai import OpenAI
+from .vector_store import RedisVectorIndex, SemanticAnswerCache
+from .kernels import quantize_int8, split_fixed, topk_int8
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+torch.set_num_threads(EMBED_THREADS)
+torch.set_num_interop_threads(1)
+logger.info(f"Embedding with {EMBED_THREADS} intra-op thread(s)")
+
+# Shared embedding model, LLM client and vector index, created once per process.
+# Every NLPProcessor binds to these instead of reloading the model per document.
+# Set EMBEDDINGS_ONNX_DIR to an int8-quantized ONNX export of MiniLM to run embeddings on ONNX Runtime.
+EMBEDDINGS_ONNX_DIR = os.getenv("EMBEDDINGS_ONNX_DIR")
+if EMBEDDINGS_ONNX_DIR:
+    from .onnx_embeddings import OnnxEmbeddings
+    _ENCODER = OnnxEmbeddings(EMBEDDINGS_ONNX_DIR, num_threads=EMBED_THREADS)
+else:
+    _ENCODER = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+    # Inference only: eval mode and frozen weights, in every thread that uses the model
+    _ENCODER.eval()
+    _ENCODER.requires_grad_(False)
+_LLM = OpenAI()
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+
+# A single Redis Search index holds the chunks of every document, tagged by document id.
+# Requires Redis Stack (or Redis with the RediSearch module).
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+_REDIS = redis.Redis.from_url(REDIS_URL)
+_INDEX = RedisVectorIndex(_REDIS)
+_INDEX.ensure_index()
+
+# Answers to semantically near-identical questions are served from Redis without calling the LLM
+QA_CACHE_THRESHOLD = float(os.getenv("QA_CACHE_THRESHOLD", "0.97"))
+_QA_CACHE = SemanticAnswerCache(_REDIS, threshold=QA_CACHE_THRESHOLD)
+_QA_CACHE.ensure_index()
+
+EMBED_BATCH_SIZE = 64
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+TOP_K = 3
+# Documents with at most this many chunks keep their embeddings in memory and are searched by brute force
+SMALL_DOC_CHUNKS = 1024
+
+PROMPT = (
+    "Use the following pieces of context to answer the question at the end. "
+    "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n\n"
+    "{context}\n\n"
+    "Question: {question}\n"
+    "Helpful Answer:"
+)
+
+def embed_texts(texts: List[str]):
+    """
+    Embed a list of texts with the shared model in batched forward passes.
+    Returns a float32 array of L2-normalized embeddings.
+    """
+    return _ENCODER.encode(
+        texts,
+        batch_size=EMBED_BATCH_SIZE,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+
+# Fallback splitter for text the compiled splitter cannot break cleanly (e.g. long runs without line breaks)
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len
+)
+
+def split_text(text: str) -> List[str]:
+    """
+    Split text into overlapping chunks of about CHUNK_SIZE bytes at paragraph, sentence or line breaks.
+    Falls back to LangChain's RecursiveCharacterTextSplitter when no such break is found.
+    """
+    raw = text.encode("utf-8")
+    starts, ends, ok = split_fixed(np.frombuffer(raw, dtype=np.uint8), CHUNK_SIZE, CHUNK_OVERLAP)
+    if not ok:
+        return _SPLITTER.split_text(text)
+    chunks = (raw[start:end].decode("utf-8").strip() for start, end in zip(starts, ends))
+    return [chunk for chunk in chunks if chunk]
+
+def delete_document_vectors(document_id: str):
+    """
+    Remove all indexed chunks and cached answers of a document.
+    """
+    _INDEX.delete_document(document_id)
+    clear_answer_cache(document_id)
+
+def clear_answer_cache(document_id: str):
+    """
+    Remove all cached answers of a document, keeping its indexed chunks.
+    """
+    _QA_CACHE.delete_document(document_id)
+
 class NLPProcessor:
     def __init__(self):
         """
         Initialize the NLPProcessor.
-        Sets up the embedding model, text splitter, and placeholders for vector store and QA chain.
+        Binds the shared LLM client and vector index, and sets up placeholders for the loaded document.
         """
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
-        self.vectorstore = None
-        self.qa_chain = None
+        self.llm = _LLM
+        self.index = _INDEX
+        self.answer_cache = _QA_CACHE
+        self.document_id = None
+        # In-memory int8 embeddings (with per-vector scales), texts and metadata for small documents (see SMALL_DOC_CHUNKS)
+        self.chunk_matrix = None
+        self.chunk_scales = None
+        self.chunk_texts = None
+        self.chunk_metadatas = None
 
     def process_document(self, text_content: str, document_id: str) -> bool:
         """
-        Process the full text of a document:
-        - Splits the text into manageable chunks.
-        - Embeds and stores the chunks in a persistent vector store (Chroma DB).
-        - Sets up a retrieval-based QA chain for answering questions about the document.
+        Process the full text of a document held in memory.
+        Kept for documents whose text was stored in the database; see process_document_streaming.
+        Returns True if successful, False otherwise.
+        """
+        return self.process_document_streaming(iter([(1, text_content)]), document_id)
+
+    def process_document_streaming(self, page_iter: Iterable[Tuple[int, str]], document_id: str) -> bool:
+        """
+        Process a document page by page, as the pages are extracted:
+        - Splits each page's text into manageable chunks, skipping exact repeats (headers, footers, boilerplate).
+        - Embeds the chunks in batches and stores each batch in the shared Redis vector index as soon as it fills.
+        - Attaches the processor to the document for answering questions about it.
         Returns True if successful, False otherwise.
         """
         try:
-            # Split the document text into overlapping chunks for better retrieval
-            texts = self.text_splitter.split_text(text_content)
-            # Wrap each chunk as a LangChain Document with metadata
-            documents = [
-                Document(
-                    page_content=text,
-                    metadata={"document_id": document_id, "chunk_id": i}
-                )
-                for i, text in enumerate(texts)
-            ]
-            # Create and persist the vector store for this document
-            self.vectorstore = Chroma.from_documents(
-                documents,
-                self.embeddings,
-                persist_directory=f"./chroma_db_{document_id}"
-            )
-            # Set up the QA chain using OpenAI and the retriever
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=OpenAI(temperature=0),
-                chain_type="stuff",
-                retriever=self.vectorstore.as_retriever(search_kwargs={"k": 3}),
-                return_source_documents=True
-            )
+            texts, metadatas = [], []
+            # Batches kept for the in-memory index until the document turns out to be too large
+            kept_embeddings, kept_texts, kept_metadatas = [], [], []
+            # Content hashes of the chunks stored so far; a repeated chunk is served by its first occurrence
+            seen = set()
+            chunk_count = 0
+            for page_num, page_text in page_iter:
+                # Split each page into overlapping chunks for better retrieval
+                for text in split_text(page_text):
+                    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                    texts.append(text)
+                    metadatas.append({"document_id": document_id, "chunk_id": chunk_count, "page": page_num})
+                    chunk_count += 1
+                    if len(texts) == EMBED_BATCH_SIZE:
+                        embeddings = self._add_chunks(document_id, texts, metadatas)
+                        if chunk_count <= SMALL_DOC_CHUNKS:
+                            kept_embeddings.append(embeddings)
+                            kept_texts += texts
+                            kept_metadatas += metadatas
+                        texts, metadatas = [], []
+            if texts:
+                embeddings = self._add_chunks(document_id, texts, metadatas)
+                kept_embeddings.append(embeddings)
+                kept_texts += texts
+                kept_metadatas += metadatas
+            if 0 < chunk_count <= SMALL_DOC_CHUNKS:
+                self.chunk_matrix, self.chunk_scales = quantize_int8(np.concatenate(kept_embeddings))
+                self.chunk_texts = kept_texts
+                self.chunk_metadatas = kept_metadatas
+            self.document_id = document_id
             return True
         except Exception as e:
             logger.error(f"Error processing document: {str(e)}")
             return False
 
+    def _add_chunks(self, document_id: str, texts: List[str], metadatas: List[dict]):
+        """
+        Embed a batch of chunks in one forward pass and add them to the vector index.
+        Returns the embeddings of the batch.
+        """
+        embeddings = embed_texts(texts)
+        self.index.add(document_id, texts, metadatas, embeddings)
+        return embeddings
+
+    def retrieve(self, query_embedding: np.ndarray, k: int = TOP_K) -> List[dict]:
+        """
+        Find the k chunks of the loaded document closest to the query embedding.
+        Small documents are searched in memory with a compiled int8 brute-force kernel; larger ones go to the Redis index.
+        Returns a list of dictionaries with the chunk content and metadata, best match first.
+        """
+        if self.chunk_matrix is None:
+            return self.index.search(self.document_id, query_embedding, k=k)
+        query_values, query_scale = quantize_int8(query_embedding)
+        indices, _ = topk_int8(self.chunk_matrix, self.chunk_scales, query_values, np.float32(query_scale), k)
+        return [
+            {"content": self.chunk_texts[i], "metadata": self.chunk_metadatas[i]}
+            for i in indices
+        ]
+
     def answer_question(self, question: str) -> dict:
         """
-        Answer a question using the QA chain for the processed document.
+        Answer a question about the processed document: retrieve the closest chunks and ask the LLM once.
+        Near-duplicates of earlier questions are answered from the semantic cache without calling the LLM.
         Returns a dictionary with the answer, source documents, and success status.
         """
         try:
-            if not self.qa_chain:
+            if not self.document_id:
                 return {
                     "error": "No document processed yet",
                     "success": False
                 }
-            # Query the QA chain for an answer
-            result = self.qa_chain({"query": question})
-            return {
-                "answer": result["result"],
-                "source_documents": [
-                    {
-                        "content": doc.page_content,
-                        "metadata": doc.metadata
-                    }
-                    for doc in result["source_documents"]
-                ],
-                "success": True
+            question_embedding = embed_texts([question])[0]
+            cached = self.answer_cache.lookup(self.document_id, question_embedding)
+            if cached is not None:
+                return {**cached, "success": True}
+            # Retrieve the most relevant chunks and stuff them into a single prompt
+            source_documents = self.retrieve(question_embedding)
+            context = "\n\n".join(doc["content"] for doc in source_documents)
+            response = self.llm.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[{"role": "user", "content": PROMPT.format(context=context, question=question)}],
+                temperature=0
+            )
+            answer = {
+                "answer": response.choices[0].message.content.strip(),
+                "source_documents": source_documents
             }
+            self.answer_cache.store(self.document_id, question_embedding, answer)
+            return {**answer, "success": True}
         except Exception as e:
             logger.error(f"Error answering question: {str(e)}")
             return {
@@ -103,25 +253,19 @@ class NLPProcessor:
 
     def load_existing_vectorstore(self, document_id: str) -> bool:
         """
-        Load a previously persisted vector store for a document, if it exists.
-        Sets up the retriever and QA chain for answering questions.
+        Attach to a document's chunks in the shared vector index, if they exist.
+        Small documents are loaded into memory for brute-force search.
         Returns True if successful, False otherwise.
         """
         try:
-            persist_directory = f"./chroma_db_{document_id}"
-            if os.path.exists(persist_directory):
-                self.vectorstore = Chroma(
-                    persist_directory=persist_directory,
-                    embedding_function=self.embeddings
-                )
-                self.qa_chain = RetrievalQA.from_chain_type(
-                    llm=OpenAI(temperature=0),
-                    chain_type="stuff",
-                    retriever=self.vectorstore.as_retriever(search_kwargs={"k": 3}),
-                    return_source_documents=True
-                )
-                return True
-            return False
+            chunk_count = self.index.count(document_id)
+            if chunk_count == 0:
+                return False
+            if chunk_count <= SMALL_DOC_CHUNKS:
+                matrix, self.chunk_texts, self.chunk_metadatas = self.index.fetch_all(document_id, chunk_count)
+                self.chunk_matrix, self.chunk_scales = quantize_int8(matrix)
+            self.document_id = document_id
+            return True
         except Exception as e:
             logger.error(f"Error loading vectorstore: {str(e)}")
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,79 @@
+"""
+onnx_embeddings.py - int8 ONNX Runtime embeddings for PDF Q&A app
+
+This module provides the OnnxEmbeddings class, a LangChain-compatible embedding model that runs an int8-quantized
+export of all-MiniLM-L6-v2 on ONNX Runtime instead of PyTorch.
+
+Export and quantize the model once with:
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 --task feature-extraction minilm-onnx/
+    optimum-cli onnxruntime quantize --avx512_vnni --onnx_model minilm-onnx/ -o minilm-onnx-int8/
+then point the EMBEDDINGS_ONNX_DIR environment variable at the quantized directory.
+"""
+
+import os
+from typing import List
+
+import numpy as np
+import onnxruntime as ort
+from langchain.embeddings.base import Embeddings
+from optimum.onnxruntime import ORTModelForFeatureExtraction
+from transformers import AutoTokenizer
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_dir: str, file_name: str = "model_quantized.onnx", max_length: int = 256, num_threads: int = None):
+        """
+        Initialize the OnnxEmbeddings.
+        Loads the tokenizer and the quantized ONNX model from model_dir on the CPU execution provider,
+        using num_threads intra-op threads (all cores by default).
+        """
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = num_threads or os.cpu_count() or 1
+        session_options.inter_op_num_threads = 1
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir,
+            file_name=file_name,
+            provider="CPUExecutionProvider",
+            session_options=session_options
+        )
+        self.max_length = max_length
+        self.dimension = self.model.config.hidden_size
+
+    def encode(self, texts: List[str], batch_size: int = 64, normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        """
+        Embed a list of texts in batches, mirroring SentenceTransformer.encode.
+        Mean-pools the token embeddings over the attention mask and optionally L2-normalizes them.
+        Returns a float32 array of shape (len(texts), dimension).
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            hidden = np.asarray(self.model(**inputs).last_hidden_state, dtype=np.float32)
+            # Mean pooling over real (non-padding) tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled)
+        return np.concatenate(batches)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of document chunks (LangChain Embeddings interface).
+        """
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query string (LangChain Embeddings interface).
+        """
+        return self.encode([text])[0].tolist()
@@ -6,11 +6,85 @@ This module provides the PDFProcessor class, which is responsible for extracting
 
 import pymupdf
 import os
+import mmap
 import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Tuple
+from .config import EMBED_THREADS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# PDFs with at least this many pages are extracted in parallel worker processes
+PARALLEL_PAGE_THRESHOLD = 32
+# Extraction workers share the cores with embedding, so the pool is sized like it
+EXTRACT_WORKERS = EMBED_THREADS
+
+# Plain-text extraction only feeds the chunker, so skip whitespace preservation and images, and join hyphenated words
+TEXT_FLAGS = pymupdf.TEXT_PRESERVE_LIGATURES | pymupdf.TEXT_MEDIABOX_CLIP | pymupdf.TEXT_DEHYPHENATE
+
+def _open_pdf(file_path: str) -> pymupdf.Document:
+    """
+    Open a PDF through a read-only memory map, so pages are faulted in from the page cache instead of read up front.
+    """
+    with open(file_path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return pymupdf.open(stream=memoryview(buffer), filetype="pdf")
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> list:
+    """
+    Extract the text of pages [start, stop) from a PDF.
+    Runs in a worker process with its own document handle, since PyMuPDF documents must not be shared across threads.
+    """
+    with _open_pdf(file_path) as doc:
+        return [doc[page_num].get_text("text", flags=TEXT_FLAGS) for page_num in range(start, stop)]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool for page extraction, created on first use and kept for the life of the process.
+    Workers are spawned rather than forked: forking after the Numba/OpenMP thread pools have started can deadlock.
+    Spawned workers re-import the __main__ module, so start the server with `uvicorn app.main:app`, not `python -m app.main`.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """
+    Drop a broken pool (e.g. a worker crashed in MuPDF or was OOM-killed) so the next caller gets a fresh one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _extract_parallel(pool: ProcessPoolExecutor, file_path: str, first: int, page_count: int) -> Iterator[Tuple[int, str]]:
+    """
+    Extract pages [first, page_count) on the pool, one contiguous range per worker, yielding them in page order.
+    """
+    workers = min(page_count - first, EXTRACT_WORKERS)
+    step = -(-(page_count - first) // workers)
+    starts = range(first, page_count, step)
+    ranges = pool.map(
+        _extract_page_range,
+        [file_path] * len(starts),
+        starts,
+        [min(start + step, page_count) for start in starts]
+    )
+    # Ranges arrive in order, so earlier pages are yielded while later ones are still extracting
+    for start, page_range in zip(starts, ranges):
+        for offset, page_text in enumerate(page_range):
+            yield start + offset + 1, page_text
+
 class PDFProcessor:
     def __init__(self, upload_dir: str = "uploads"):
         """
@@ -20,47 +94,44 @@ class PDFProcessor:
         self.upload_dir = upload_dir
         os.makedirs(upload_dir, exist_ok=True)
 
-    def extract_text_from_pdf(self, file_path: str) -> dict:
+    def iter_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
         """
-        Extract all text from a PDF file, page by page.
-        Returns a dictionary with the full text, per-page texts, page count, and success status.
+        Extract the text of a PDF file lazily, page by page.
+        Yields (page_number, text) tuples in page order, starting at 1.
         """
-        try:
-            doc = pymupdf.open(file_path)
-            text_content = ""
-            page_texts = []
-            # Iterate through each page and extract its text
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                page_text = page.get_text()
-                text_content += page_text + "\n\n"
-                page_texts.append({
-                    "page": page_num + 1,
-                    "text": page_text
-                })
-            doc.close()
-            return {
-                "full_text": text_content,
-                "page_texts": page_texts,
-                "page_count": len(page_texts),
-                "success": True
-            }
-        except Exception as e:
-            logger.error(f"Error processing PDF: {str(e)}")
-            return {
-                "error": str(e),
-                "success": False
-            }
+        with _open_pdf(file_path) as doc:
+            page_count = len(doc)
+            if page_count < PARALLEL_PAGE_THRESHOLD:
+                for page_num, page in enumerate(doc):
+                    yield page_num + 1, page.get_text("text", flags=TEXT_FLAGS)
+                return
+        # Extract in parallel; if the pool breaks, replace it and retry the remaining pages once
+        next_page = 0
+        for attempt in range(2):
+            pool = _get_pool()
+            try:
+                for page_num, page_text in _extract_parallel(pool, file_path, next_page, page_count):
+                    next_page = page_num
+                    yield page_num, page_text
+                return
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                if attempt:
+                    raise
+                logger.warning(f"PDF extraction pool broke at page {next_page + 1} of {file_path}, retrying")
 
     def get_file_info(self, file_path: str) -> dict:
         """
-        Get basic file information such as file size (in bytes).
-        Returns a dictionary with file size and success status.
+        Get basic file information such as file size (in bytes) and page count.
+        Returns a dictionary with file size, page count, and success status.
         """
         try:
             file_size = os.path.getsize(file_path)
+            with _open_pdf(file_path) as doc:
+                page_count = len(doc)
             return {
                 "file_size": file_size,
+                "page_count": page_count,
                 "success": True
             }
         except Exception as e:
@@ -0,0 +1,208 @@
+"""
+vector_store.py - Redis vector index for PDF Q&A app
+
+This module provides the RedisVectorIndex class, which stores the chunk embeddings of all documents in a single
+Redis Search HNSW index, tagged by document id, and runs filtered KNN searches over it, and the SemanticAnswerCache
+class, which caches answers keyed by question embedding so near-duplicate questions skip the LLM.
+"""
+
+import json
+import logging
+import uuid
+from typing import List, Optional, Tuple
+
+import numpy as np
+import redis
+from redis.commands.search.field import NumericField, TagField, TextField, VectorField
+from redis.commands.search.query import Query
+try:
+    from redis.commands.search.index_definition import IndexDefinition, IndexType
+except ImportError:  # redis-py < 6
+    from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RedisVectorIndex:
+    def __init__(self, client: redis.Redis, index_name: str = "chunk_idx", prefix: str = "doc:", dimension: int = 384):
+        """
+        Initialize the RedisVectorIndex.
+        Chunks are stored as hashes under f"{prefix}{document_id}:chunk:{chunk_id}".
+        """
+        self.client = client
+        self.index_name = index_name
+        self.prefix = prefix
+        self.dimension = dimension
+
+    def ensure_index(self):
+        """
+        Create the HNSW index over the chunk hashes if it does not exist yet.
+        """
+        try:
+            self.client.ft(self.index_name).info()
+        except redis.ResponseError:
+            self.client.ft(self.index_name).create_index(
+                [
+                    TextField("text"),
+                    TagField("doc_id"),
+                    NumericField("chunk_id"),
+                    NumericField("page"),
+                    VectorField("embedding", "HNSW", {
+                        "TYPE": "FLOAT32",
+                        "DIM": self.dimension,
+                        "DISTANCE_METRIC": "COSINE"
+                    })
+                ],
+                definition=IndexDefinition(prefix=[self.prefix], index_type=IndexType.HASH)
+            )
+            logger.info(f"Created Redis vector index {self.index_name}")
+
+    def add(self, document_id: str, texts: List[str], metadatas: List[dict], embeddings: np.ndarray):
+        """
+        Store a batch of chunks and their embeddings for a document in one pipelined round-trip.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        pipe = self.client.pipeline(transaction=False)
+        for text, metadata, embedding in zip(texts, metadatas, embeddings):
+            pipe.hset(f"{self.prefix}{document_id}:chunk:{metadata['chunk_id']}", mapping={
+                "text": text,
+                "doc_id": document_id,
+                "chunk_id": metadata["chunk_id"],
+                "page": metadata["page"],
+                "embedding": embedding.tobytes()
+            })
+        pipe.execute()
+
+    def search(self, document_id: str, query_embedding: np.ndarray, k: int = 3) -> List[dict]:
+        """
+        Find the k chunks of a document closest to the query embedding.
+        Returns a list of dictionaries with the chunk content and metadata, best match first.
+        """
+        query = (
+            Query(f"(@doc_id:{{{document_id}}})=>[KNN {k} @embedding $vec AS score]")
+            .sort_by("score")
+            .return_fields("text", "chunk_id", "page", "score")
+            .paging(0, k)
+            .dialect(2)
+        )
+        vector = np.asarray(query_embedding, dtype=np.float32).tobytes()
+        result = self.client.ft(self.index_name).search(query, query_params={"vec": vector})
+        return [
+            {
+                "content": doc.text,
+                "metadata": {
+                    "document_id": document_id,
+                    "chunk_id": int(doc.chunk_id),
+                    "page": int(doc.page)
+                }
+            }
+            for doc in result.docs
+        ]
+
+    def count(self, document_id: str) -> int:
+        """
+        Count the chunks indexed for a document.
+        """
+        query = Query(f"@doc_id:{{{document_id}}}").no_content().paging(0, 0).dialect(2)
+        return self.client.ft(self.index_name).search(query).total
+
+    def fetch_all(self, document_id: str, chunk_count: int) -> Tuple[np.ndarray, List[str], List[dict]]:
+        """
+        Load every chunk of a document (ids 0..chunk_count-1) in one pipelined round-trip.
+        Returns the (chunk_count, dimension) float32 embedding matrix, the chunk texts, and their metadata.
+        """
+        pipe = self.client.pipeline(transaction=False)
+        for chunk_id in range(chunk_count):
+            pipe.hmget(f"{self.prefix}{document_id}:chunk:{chunk_id}", "embedding", "text", "page")
+        rows = pipe.execute()
+        matrix = np.empty((chunk_count, self.dimension), dtype=np.float32)
+        texts, metadatas = [], []
+        for chunk_id, (embedding, text, page) in enumerate(rows):
+            matrix[chunk_id] = np.frombuffer(embedding, dtype=np.float32)
+            texts.append(text.decode("utf-8"))
+            metadatas.append({"document_id": document_id, "chunk_id": chunk_id, "page": int(page)})
+        return matrix, texts, metadatas
+
+    def delete_document(self, document_id: str):
+        """
+        Remove all chunks of a document from the index.
+        """
+        keys = list(self.client.scan_iter(match=f"{self.prefix}{document_id}:chunk:*", count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+class SemanticAnswerCache:
+    def __init__(self, client: redis.Redis, index_name: str = "qcache_idx", prefix: str = "qcache:",
+                 dimension: int = 384, threshold: float = 0.97, ttl_seconds: int = 24 * 60 * 60):
+        """
+        Initialize the SemanticAnswerCache.
+        A cached answer is reused when the cosine similarity between the questions is at least threshold.
+        Entries are stored as hashes under f"{prefix}{document_id}:{entry_id}" and expire after ttl_seconds.
+        """
+        self.client = client
+        self.index_name = index_name
+        self.prefix = prefix
+        self.dimension = dimension
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+
+    def ensure_index(self):
+        """
+        Create the HNSW index over the cached questions if it does not exist yet.
+        """
+        try:
+            self.client.ft(self.index_name).info()
+        except redis.ResponseError:
+            self.client.ft(self.index_name).create_index(
+                [
+                    TagField("doc"),
+                    VectorField("embedding", "HNSW", {
+                        "TYPE": "FLOAT32",
+                        "DIM": self.dimension,
+                        "DISTANCE_METRIC": "COSINE"
+                    })
+                ],
+                definition=IndexDefinition(prefix=[self.prefix], index_type=IndexType.HASH)
+            )
+            logger.info(f"Created Redis vector index {self.index_name}")
+
+    def lookup(self, document_id: str, question_embedding: np.ndarray) -> Optional[dict]:
+        """
+        Find the cached answer for the most similar question previously asked about a document.
+        Returns the cached result dictionary, or None if no question is similar enough.
+        """
+        query = (
+            Query(f"(@doc:{{{document_id}}})=>[KNN 1 @embedding $vec AS score]")
+            .sort_by("score")
+            .return_fields("answer", "score")
+            .paging(0, 1)
+            .dialect(2)
+        )
+        vector = np.asarray(question_embedding, dtype=np.float32).tobytes()
+        result = self.client.ft(self.index_name).search(query, query_params={"vec": vector})
+        # COSINE scores are distances: similarity = 1 - distance
+        if result.docs and 1.0 - float(result.docs[0].score) >= self.threshold:
+            return json.loads(result.docs[0].answer)
+        return None
+
+    def store(self, document_id: str, question_embedding: np.ndarray, result: dict):
+        """
+        Cache the result of answering a question about a document.
+        """
+        key = f"{self.prefix}{document_id}:{uuid.uuid4().hex}"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            "doc": document_id,
+            "embedding": np.asarray(question_embedding, dtype=np.float32).tobytes(),
+            "answer": json.dumps(result)
+        })
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def delete_document(self, document_id: str):
+        """
+        Remove all cached answers for a document.
+        """
+        keys = list(self.client.scan_iter(match=f"{self.prefix}{document_id}:*", count=1000))
+        if keys:
+            self.client.delete(*keys)
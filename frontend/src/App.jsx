@@ -6,6 +6,7 @@ import axios from 'axios';
 import './App.css';
 
 const API_BASE_URL = 'http://localhost:8000';
+const STATUS_POLL_INTERVAL = 2000; // ms between status checks while a document is processing
 
 function App() {
   const [currentDocument, setCurrentDocument] = useState(null);
@@ -27,6 +28,37 @@ function App() {
     }
   }, [currentDocument]);
 
+  // Uploads are indexed in the background: poll the selected document until it is ready (or failed)
+  useEffect(() => {
+    if (!currentDocument || currentDocument.status !== 'processing') return;
+    const documentId = currentDocument.id;
+    let cancelled = false;
+    let timer;
+    const poll = async () => {
+      try {
+        const response = await axios.get(`${API_BASE_URL}/documents/${documentId}/status`);
+        if (cancelled) return;
+        if (response.data.status !== 'processing') {
+          updateDocumentStatus(documentId, response.data.status);
+          return;
+        }
+      } catch (error) {
+        console.error('Error fetching document status:', error);
+      }
+      if (!cancelled) timer = setTimeout(poll, STATUS_POLL_INTERVAL);
+    };
+    timer = setTimeout(poll, STATUS_POLL_INTERVAL);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [currentDocument?.id, currentDocument?.status]);
+
+  const updateDocumentStatus = (documentId, status) => {
+    setDocuments(prev => prev.map(doc => (doc.id === documentId ? { ...doc, status } : doc)));
+    setCurrentDocument(prev => (prev && prev.id === documentId ? { ...prev, status } : prev));
+  };
+
   const fetchDocuments = async () => {
     try {
       const response = await axios.get(`${API_BASE_URL}/documents`);
@@ -71,15 +103,26 @@ function App() {
         },
       });
 
+      // The same file was uploaded before: select the existing document instead of listing it twice
+      const existingDocument = response.data.duplicate
+        ? documents.find(doc => doc.id === response.data.document_id)
+        : null;
+      if (existingDocument) {
+        setCurrentDocument(existingDocument);
+        setLoading(false);
+        return { success: true, document: existingDocument };
+      }
+
       const newDocument = {
         id: response.data.document_id,
         filename: response.data.filename,
         page_count: response.data.page_count,
         file_size: response.data.file_size,
         upload_date: new Date().toISOString(),
+        status: response.data.status,
       };
 
-      setDocuments([...documents, newDocument]);
+      setDocuments([newDocument, ...documents]);
       setCurrentDocument(newDocument);
       setLoading(false);
       
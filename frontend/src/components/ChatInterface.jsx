@@ -6,6 +6,8 @@ const ChatInterface = ({ currentDocument, onQuestionSubmit, chatHistory, setChat
   const [inputValue, setInputValue] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
+  // Questions can only be asked once the document has been indexed
+  const documentReady = currentDocument?.status === 'ready';
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -17,7 +19,7 @@ const ChatInterface = ({ currentDocument, onQuestionSubmit, chatHistory, setChat
 
   const handleSubmit = async (e) => {
     e.preventDefault();
-    if (!inputValue.trim() || !currentDocument || isLoading) return;
+    if (!inputValue.trim() || !currentDocument || !documentReady || isLoading) return;
 
     setIsLoading(true);
     try {
@@ -158,13 +160,19 @@ const ChatInterface = ({ currentDocument, onQuestionSubmit, chatHistory, setChat
             type="text"
             value={inputValue}
             onChange={(e) => setInputValue(e.target.value)}
-            placeholder="Send a message..."
+            placeholder={
+              currentDocument.status === 'processing'
+                ? 'Processing document...'
+                : currentDocument.status === 'failed'
+                  ? 'Processing failed, please upload the document again'
+                  : 'Send a message...'
+            }
             className="flex-1 px-3 md:px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-green-500 focus:border-transparent text-xs md:text-base"
-            disabled={isLoading}
+            disabled={isLoading || !documentReady}
           />
           <button
             type="submit"
-            disabled={!inputValue.trim() || isLoading}
+            disabled={!inputValue.trim() || isLoading || !documentReady}
             className="px-3 md:px-4 py-2 bg-green-500 text-white rounded-lg hover:bg-green-600 disabled:bg-gray-400 disabled:cursor-not-allowed transition-colors text-xs md:text-base"
           >
             <Send className="w-4 h-4 md:w-5 md:h-5" />
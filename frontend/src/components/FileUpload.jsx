@@ -153,6 +153,12 @@ const FileUpload = ({
                   <p className="text-xs text-gray-500 mt-1">
                     {formatFileSize(doc.file_size)}
                   </p>
+                  {doc.status === 'processing' && (
+                    <p className="text-xs text-yellow-600 mt-1">Processing...</p>
+                  )}
+                  {doc.status === 'failed' && (
+                    <p className="text-xs text-red-500 mt-1">Processing failed</p>
+                  )}
                 </div>
                 {/* Delete button */}
                 <button